@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+タイル分析の融合カーネル
+- 輝度 / 明暗比率 / RGBヒストグラムをuint8バッファ1走査でまとめて算出
+- Numba JIT（nogil: タイル毎スレッド並列と併用可）、未導入時はNumPy版
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _analyze_rgb_numpy(rgb):
+    """NumPyフォールバック（チャネル毎に複数パス）"""
+    gray = (0.299 * rgb[..., 0] + 0.587 * rgb[..., 1]
+            + 0.114 * rgb[..., 2]).astype(np.uint8)
+    hist = np.stack([
+        np.bincount(rgb[..., c].ravel(), minlength=256).astype(np.int64)
+        for c in range(3)
+    ])
+    dark = float((gray < 85).mean())
+    light = float((gray >= 170).mean())
+    mid = 1.0 - dark - light
+    brightness = float(gray.mean()) / 255
+    return dark, mid, light, brightness, hist
+
+
+if HAS_NUMBA:
+    @njit(cache=True, nogil=True)
+    def _analyze_rgb_jit(rgb):
+        h, w = rgb.shape[0], rgb.shape[1]
+        hist = np.zeros((3, 256), dtype=np.int64)
+        dark = 0
+        light = 0
+        luma_sum = 0.0
+
+        for y in range(h):
+            for x in range(w):
+                r = rgb[y, x, 0]
+                g = rgb[y, x, 1]
+                b = rgb[y, x, 2]
+                hist[0, r] += 1
+                hist[1, g] += 1
+                hist[2, b] += 1
+                luma = np.uint8(0.299 * r + 0.587 * g + 0.114 * b)
+                luma_sum += luma
+                if luma < 85:
+                    dark += 1
+                elif luma >= 170:
+                    light += 1
+
+        n = h * w
+        dark_f = dark / n
+        light_f = light / n
+        mid_f = 1.0 - dark_f - light_f
+        return dark_f, mid_f, light_f, luma_sum / (n * 255), hist
+
+
+def analyze_rgb(rgb: np.ndarray) -> tuple:
+    """
+    (dark, mid, light, brightness, hist) を返す
+    hist は (3, 256) int64 のRGBヒストグラム
+    """
+    if HAS_NUMBA:
+        return _analyze_rgb_jit(np.ascontiguousarray(rgb))
+    return _analyze_rgb_numpy(rgb)
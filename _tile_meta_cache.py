@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+タイルメタデータ永続キャッシュ
+- dHash / ヒストグラム / 色メタデータをsqliteに保存
+- キー: タイル絶対パス（mtime一致時のみヒット）
+- 前回フレームタイルのPNG再デコードをスキップする
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+
+CACHE_DB_PATH = os.path.expanduser("~/.cache/vlm/tile_meta.sqlite")
+MAX_ROWS = 5000  # 80セット×24タイル×前後2フレーム+余裕
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _prune(conn: sqlite3.Connection):
+    """
+    不要行の削除（接続時に1回）
+    - cleanup_old()でタイルディレクトリ毎消えた行（大半はこれ）
+    - それでもMAX_ROWSを超える分はmtimeの古い順に落とす
+    """
+    rows = conn.execute("SELECT path FROM tile_meta").fetchall()
+    dead = [(p,) for (p,) in rows if not os.path.exists(p)]
+    if dead:
+        conn.executemany("DELETE FROM tile_meta WHERE path = ?", dead)
+    conn.execute(
+        "DELETE FROM tile_meta WHERE path NOT IN "
+        "(SELECT path FROM tile_meta ORDER BY mtime DESC LIMIT ?)",
+        (MAX_ROWS,)
+    )
+    conn.commit()
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+        # compare_tilesはスレッドから呼ぶので_lockで直列化する
+        _conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS tile_meta (
+                path  TEXT PRIMARY KEY,
+                mtime REAL,
+                dhash TEXT,
+                hist  BLOB,
+                meta  TEXT
+            )
+        """)
+        _prune(_conn)
+    return _conn
+
+
+def load_meta(path: str) -> dict:
+    """キャッシュ取得（未登録またはmtime不一致ならNone）"""
+    with _lock:
+        row = _get_conn().execute(
+            "SELECT mtime, dhash, hist, meta FROM tile_meta WHERE path = ?",
+            (os.path.abspath(path),)
+        ).fetchone()
+
+    if row is None:
+        return None
+    mtime, dhash, hist, meta = row
+    if mtime != os.path.getmtime(path):
+        return None
+
+    result = json.loads(meta)
+    result['dhash'] = int(dhash)  # uint64はsqlite INTEGERに収まらないのでTEXT
+    result['hist'] = np.frombuffer(hist, dtype=np.int64).reshape(3, 256)
+    return result
+
+
+def save_meta(path: str, meta: dict):
+    """キャッシュ保存（dhash: int, hist: (3,256)配列, 他はJSON化）"""
+    hist = np.ascontiguousarray(meta['hist'], dtype=np.int64)
+    rest = {k: v for k, v in meta.items() if k not in ('dhash', 'hist')}
+
+    with _lock:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO tile_meta (path, mtime, dhash, hist, meta) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(path),
+                os.path.getmtime(path),
+                str(int(meta['dhash'])),
+                hist.tobytes(),
+                json.dumps(rest, ensure_ascii=False)
+            )
+        )
+        conn.commit()
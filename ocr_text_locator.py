@@ -14,11 +14,11 @@ OCR文字座標抽出ツール - スクショから文字列と座標を抽出
     python3 ocr_text_coords.py --all        # 保持中の全枚（最大5枚）を処理
     python3 ocr_text_coords.py --search "文字列"  # 特定文字列を検索
     python3 ocr_text_coords.py --diff       # 時系列差分表示
+    python3 ocr_text_coords.py --all --batch  # tesseract1回起動のバッチ処理
 """
 
 import os
 import sys
-import glob
 import json
 from datetime import datetime
 
@@ -31,17 +31,101 @@ SCREENSHOT_DIR = os.path.expanduser("~/Generalstab/SCA/screenshots")
 
 def get_sorted_screenshots():
     """タイムスタンプ順でスクショ一覧取得（新しい順）"""
-    pattern = os.path.join(SCREENSHOT_DIR, "screenshot_*.png")
-    files = glob.glob(pattern)
+    try:
+        with os.scandir(SCREENSHOT_DIR) as it:
+            files = [entry.path for entry in it
+                     if entry.name.startswith("screenshot_")
+                     and entry.name.endswith(".png")]
+    except FileNotFoundError:
+        return []
     files.sort(reverse=True)
     return files
 
+def _enlarge_2x(img):
+    """
+    OCR精度向上用の2倍拡大
+    cv2があればSIMD実装のLANCZOS4、なければPillowのLANCZOS
+    （PillowをPillow-SIMDに差し替えても後者が高速化される）
+    """
+    from PIL import Image
+    w, h = img.size
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return img.resize((w * 2, h * 2), Image.LANCZOS)
+
+    arr = np.asarray(img.convert('RGB'))
+    big = cv2.resize(arr, (w * 2, h * 2), interpolation=cv2.INTER_LANCZOS4)
+    return Image.fromarray(big)
+
+# tesserocr APIシングルトン（プロセス内でLSTMモデルを使い回す）
+_TESS_API = None
+_TESS_API_FAILED = False  # 初期化失敗を記憶して画像毎の再試行を避ける
+
+def _get_tesserocr_api():
+    """tesserocr API取得（初回のみモデルロード）"""
+    global _TESS_API, _TESS_API_FAILED
+    if _TESS_API_FAILED:
+        raise RuntimeError("tesserocr初期化失敗（記憶済み）")
+    if _TESS_API is None:
+        try:
+            import tesserocr
+            _TESS_API = tesserocr.PyTessBaseAPI(
+                lang='jpn+eng',
+                psm=tesserocr.PSM.SINGLE_BLOCK
+            )
+        except (ImportError, RuntimeError):
+            # 未導入、またはtessdataにjpnが無い等の初期化失敗
+            _TESS_API_FAILED = True
+            raise
+    return _TESS_API
+
+def _ocr_words_tesserocr(img):
+    """tesserocr（プロセス内API）でワード単位OCR"""
+    import tesserocr
+    api = _get_tesserocr_api()
+    api.SetImage(img)
+    api.Recognize()
+    ri = api.GetIterator()
+
+    words = []
+    if ri is None:
+        return words
+    level = tesserocr.RIL.WORD
+    for r in tesserocr.iterate_level(ri, level):
+        try:
+            text = r.GetUTF8Text(level)
+        except RuntimeError:
+            continue
+        box = r.BoundingBox(level)
+        if box is None:
+            continue
+        x1, y1, x2, y2 = box
+        words.append((text, r.Confidence(level), x1, y1, x2 - x1, y2 - y1))
+    return words
+
+def _ocr_words_pytesseract(img):
+    """pytesseract（画像毎にtesseractサブプロセス起動）でワード単位OCR"""
+    import pytesseract
+    from pytesseract import Output
+
+    d = pytesseract.image_to_data(
+        img,
+        output_type=Output.DICT,
+        lang='jpn+eng',
+        config='--psm 6'  # Assume uniform block of text
+    )
+    return [
+        (d['text'][i], d['conf'][i],
+         d['left'][i], d['top'][i], d['width'][i], d['height'][i])
+        for i in range(len(d['text']))
+    ]
+
 def extract_text_coords(image_path):
     """画像からOCRで文字列と座標を抽出"""
     try:
-        import pytesseract
         from PIL import Image
-        from pytesseract import Output
     except ImportError:
         print("❌ 必要なライブラリがありません")
         print("   pip install pytesseract pillow")
@@ -57,33 +141,30 @@ def extract_text_coords(image_path):
         scale_y = SCREEN_HEIGHT / img_height
 
         # 画像を2倍に拡大（OCR精度向上）
-        img_enlarged = img.resize((img_width * 2, img_height * 2), Image.LANCZOS)
-
-        # OCR実行（日本語+英語）
-        d = pytesseract.image_to_data(
-            img_enlarged,
-            output_type=Output.DICT,
-            lang='jpn+eng',
-            config='--psm 6'  # Assume uniform block of text
-        )
+        img_enlarged = _enlarge_2x(img)
+
+        # OCR実行（日本語+英語）tesserocr優先、使えなければpytesseract
+        # （未導入のImportErrorだけでなく、tessdata不備等の初期化RuntimeErrorも拾う）
+        try:
+            words = _ocr_words_tesserocr(img_enlarged)
+        except (ImportError, RuntimeError):
+            try:
+                words = _ocr_words_pytesseract(img_enlarged)
+            except ImportError:
+                print("❌ 必要なライブラリがありません")
+                print("   pip install tesserocr または pytesseract")
+                print("   sudo apt install tesseract-ocr tesseract-ocr-jpn")
+                return None
 
         results = []
-        n_boxes = len(d['text'])
 
-        for i in range(n_boxes):
-            text = d['text'][i].strip()
-            conf = d['conf'][i]
+        for text, conf, x, y, w, h in words:
+            text = text.strip()
 
             # 空テキストや低信頼度はスキップ
             if not text or conf == -1 or conf < 50:
                 continue
 
-            # バウンディングボックス（拡大画像上の座標）
-            x = d['left'][i]
-            y = d['top'][i]
-            w = d['width'][i]
-            h = d['height'][i]
-
             # 中央座標（拡大画像→実画面座標に変換）
             # 拡大画像は2倍なので、2で割って元のスケールに戻す
             center_x = int((x + w / 2) / 2 * scale_x)
@@ -104,6 +185,79 @@ def extract_text_coords(image_path):
         print(f"❌ OCRエラー: {e}")
         return None
 
+def extract_text_coords_batch(image_paths):
+    """
+    複数画像を1回のtesseract起動でまとめてOCR（リスト入力バッチ）
+    画像毎の起動コスト（初期化~200ms）を1回に集約する
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        print("❌ 必要なライブラリがありません")
+        print("   pip install pillow")
+        return None
+
+    import subprocess
+    import tempfile
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # 各画像を2倍拡大して一時PNGに書き出し
+            scales = []
+            enlarged_paths = []
+            for i, path in enumerate(image_paths):
+                img = Image.open(path)
+                w, h = img.size
+                scales.append((SCREEN_WIDTH / w, SCREEN_HEIGHT / h))
+                img_enlarged = _enlarge_2x(img)
+                enlarged_path = os.path.join(tmp_dir, f"page_{i:03d}.png")
+                img_enlarged.save(enlarged_path)
+                enlarged_paths.append(enlarged_path)
+
+            # リストファイル入力で1回だけtesseractを起動
+            list_path = os.path.join(tmp_dir, "list.txt")
+            with open(list_path, 'w') as f:
+                f.write('\n'.join(enlarged_paths))
+
+            proc = subprocess.run(
+                ['tesseract', list_path, '-', '--psm', '6', '-l', 'jpn+eng', 'tsv'],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                raise RuntimeError(proc.stderr.strip())
+
+        # マルチページTSVをpage_num毎に振り分け
+        all_results = [[] for _ in image_paths]
+        for line in proc.stdout.splitlines()[1:]:  # ヘッダ行スキップ
+            cols = line.split('\t')
+            if len(cols) < 12:
+                continue
+            level, page = int(cols[0]), int(cols[1])
+            if level != 5:  # ワード行のみ
+                continue
+
+            text = cols[11].strip()
+            conf = float(cols[10])
+            if not text or conf == -1 or conf < 50:
+                continue
+
+            x, y, w, h = (int(c) for c in cols[6:10])
+            scale_x, scale_y = scales[page - 1]
+            all_results[page - 1].append({
+                'text': text,
+                'x': int((x + w / 2) / 2 * scale_x),
+                'y': int((y + h / 2) / 2 * scale_y),
+                'conf': int(conf),
+                'width': int(w * scale_x),
+                'height': int(h * scale_y)
+            })
+
+        return all_results
+
+    except Exception as e:
+        print(f"❌ OCRエラー: {e}")
+        return None
+
 def format_results(results, filename):
     """結果をフォーマット出力"""
     print(f"\n📸 {filename}")
@@ -187,11 +341,36 @@ def main():
     print(f"   画面解像度: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
     print(f"   処理対象: {len(target_files)}枚")
 
+    # Pillow-SIMD検出（ビルド番号に.postNが付く）
+    try:
+        import PIL
+        if '.post' in PIL.__version__:
+            print(f"   Pillow-SIMD: 有効 ({PIL.__version__})")
+    except ImportError:
+        pass
+
     all_results = []
 
-    for filepath in target_files:
+    # 複数枚はデフォルトでプロセス並列、--batchでtesseract1回起動に集約
+    batch_results = None
+    if len(target_files) >= 2:
+        if "--batch" in sys.argv:
+            batch_results = extract_text_coords_batch(target_files)
+        else:
+            # tesseract内部のOpenMP並列は逆効果なので
+            # 1スレッド固定×Pythonプロセス並列でシャーディングする
+            os.environ['OMP_THREAD_LIMIT'] = '1'
+            from concurrent.futures import ProcessPoolExecutor
+            workers = min(len(target_files), os.cpu_count())
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                batch_results = list(pool.map(extract_text_coords, target_files))
+
+    for i, filepath in enumerate(target_files):
         filename = os.path.basename(filepath)
-        results = extract_text_coords(filepath)
+        if batch_results is not None:
+            results = batch_results[i]
+        else:
+            results = extract_text_coords(filepath)
 
         if results is None:
             continue
@@ -23,15 +23,18 @@ Screenshot Keeper - VLA 4枚自動撮影版（採用構成）
     python3 screenshot_experiment.py      # 全19パターン生成
 """
 
+import io
 import os
 import sys
-import glob
+import heapq
 import time
 import signal
+import select
 import subprocess
-import tempfile
 from datetime import datetime
-from PIL import Image, ImageDraw
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
 
 # 設定
 SCREENSHOT_DIR = os.path.expanduser("~/Generalstab/VLA_screenshots")
@@ -41,38 +44,56 @@ GRID_MACRO = 48  # マクロ把握用
 GRID_MICRO = 24  # ミクロ精度用
 GRID_CHECKER = 32  # チェッカーボード用
 
+# タイルPNGの非同期書き出し用（takeの戻り後にドレインさせる）
+_WRITE_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def _report_write_error(future):
+    """非同期書き込みの失敗を捨てずにログへ出す（完了コールバック）"""
+    err = future.exception()
+    if err:
+        print(f"❌ タイル書き込み失敗: {err}")
+
 
 def ensure_dir():
     os.makedirs(SCREENSHOT_DIR, exist_ok=True)
     os.makedirs(os.path.dirname(SCREENSHOT_PATH_FILE), exist_ok=True)
 
 
-def get_sorted_sets():
-    """タイムスタンプ順でセット一覧取得（新しい順）"""
-    # 新形式: *_grid24div.png
-    pattern = os.path.join(SCREENSHOT_DIR, "*_grid24div.png")
-    files = glob.glob(pattern)
-    # 旧形式もチェック
-    for old_suffix in ["*_grid48.png", "*_grid.png"]:
-        files.extend(glob.glob(os.path.join(SCREENSHOT_DIR, old_suffix)))
-    # タイムスタンプ抽出してソート
+def _scan_timestamps() -> set:
+    """scandir1回でセットのタイムスタンプ集合を取得（ファイル毎のstatなし）"""
+    # 新形式: *_grid24div.png / 旧形式: *_grid48.png, *_grid.png
+    suffixes = ("_grid24div.png", "_grid48.png", "_grid.png")
     timestamps = set()
-    for f in files:
-        basename = os.path.basename(f)
-        for suffix in ["_grid24div.png", "_grid48.png", "_grid.png"]:
-            basename = basename.replace(suffix, "")
-        timestamps.add(basename)
+    try:
+        with os.scandir(SCREENSHOT_DIR) as it:
+            for entry in it:
+                for suffix in suffixes:
+                    if entry.name.endswith(suffix):
+                        timestamps.add(entry.name[:-len(suffix)])
+                        break
+    except FileNotFoundError:
+        pass
+    return timestamps
+
+
+def get_sorted_sets(limit=None):
+    """タイムスタンプ順でセット一覧取得（新しい順、limit指定で上位のみ）"""
+    timestamps = _scan_timestamps()
+    if limit is not None:
+        return heapq.nlargest(limit, timestamps)
     return sorted(timestamps, reverse=True)
 
 
 def cleanup_old():
     """古いセットを削除（MAX_KEEPセット残す）"""
     import shutil
-    sets = get_sorted_sets()
+    timestamps = _scan_timestamps()
     deleted = []
 
-    if len(sets) > MAX_KEEP:
-        old_sets = sets[MAX_KEEP:]
+    if len(timestamps) > MAX_KEEP:
+        # 全ソートせず溢れた分（古い側）だけ部分選択
+        old_sets = heapq.nsmallest(len(timestamps) - MAX_KEEP, timestamps)
         for ts in old_sets:
             # 新形式: grid24div + tilesディレクトリ
             grid_path = os.path.join(SCREENSHOT_DIR, f"{ts}_grid24div.png")
@@ -91,78 +112,149 @@ def cleanup_old():
     return deleted
 
 
-def capture_screen() -> Image.Image:
-    """PowerShellでスクリーンショット取得"""
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_path = tmp.name
-
-    try:
-        win_path = subprocess.run(
-            ["wslpath", "-w", tmp_path],
-            capture_output=True, text=True
-        ).stdout.strip()
-
-        ps_script = f'''
+# 常駐PowerShell: stdinの1行をトリガに撮影し、
+# stdoutへ「バイト数\n + PNGバイト列」を直接書き出すループ（ディスク経由なし）
+_PS_LOOP_SCRIPT = '''
 Add-Type -AssemblyName System.Windows.Forms
-$screen = [System.Windows.Forms.Screen]::PrimaryScreen
-$bitmap = New-Object System.Drawing.Bitmap($screen.Bounds.Width, $screen.Bounds.Height)
-$graphics = [System.Drawing.Graphics]::FromImage($bitmap)
-$graphics.CopyFromScreen($screen.Bounds.Location, [System.Drawing.Point]::Empty, $screen.Bounds.Size)
-$bitmap.Save("{win_path}", [System.Drawing.Imaging.ImageFormat]::Png)
-$graphics.Dispose()
-$bitmap.Dispose()
+$out = [Console]::OpenStandardOutput()
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    $screen = [System.Windows.Forms.Screen]::PrimaryScreen
+    $bitmap = New-Object System.Drawing.Bitmap($screen.Bounds.Width, $screen.Bounds.Height)
+    $graphics = [System.Drawing.Graphics]::FromImage($bitmap)
+    $graphics.CopyFromScreen($screen.Bounds.Location, [System.Drawing.Point]::Empty, $screen.Bounds.Size)
+    $ms = New-Object System.IO.MemoryStream
+    $bitmap.Save($ms, [System.Drawing.Imaging.ImageFormat]::Png)
+    $bytes = $ms.ToArray()
+    $header = [System.Text.Encoding]::ASCII.GetBytes("$($bytes.Length)`n")
+    $out.Write($header, 0, $header.Length)
+    $out.Write($bytes, 0, $bytes.Length)
+    $out.Flush()
+    $ms.Dispose()
+    $graphics.Dispose()
+    $bitmap.Dispose()
+}
 '''
-        result = subprocess.run(
-            ["powershell.exe", "-Command", ps_script],
-            capture_output=True, text=True, timeout=10
+
+
+CAPTURE_TIMEOUT = 10  # 秒（旧実装のsubprocess timeoutと同等）
+
+
+class _PSCaptureDaemon:
+    """PowerShell常駐プロセス（起動コスト~300msを初回の1回に集約）"""
+
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            ["powershell.exe", "-NoProfile", "-Command", _PS_LOOP_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
         )
+        self._buf = bytearray()
+        self._dead = False
+
+    def alive(self) -> bool:
+        # kill直後はpoll()がまだNoneを返しうるので自前フラグも見る
+        return not self._dead and self._proc.poll() is None
+
+    def kill(self):
+        self._dead = True
+        try:
+            self._proc.kill()
+        except OSError:
+            pass
+
+    def _fill(self, deadline: float):
+        """stdoutから1チャンク読み足す（期限超過でデーモンを殺してタイムアウト）"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select(
+                [self._proc.stdout], [], [], remaining)[0]:
+            # 固まったデーモンは殺す→次回_get_capture_daemon()が再起動する
+            self.kill()
+            raise RuntimeError(f"PowerShellエラー: {CAPTURE_TIMEOUT}秒以内に応答なし")
+        chunk = os.read(self._proc.stdout.fileno(), 65536)
+        if not chunk:
+            self.kill()
+            raise RuntimeError("PowerShellエラー: 画像受信が途中で切断されました")
+        self._buf.extend(chunk)
+
+    def _read_line(self, deadline: float) -> bytes:
+        while b"\n" not in self._buf:
+            self._fill(deadline)
+        i = self._buf.index(b"\n")
+        line = bytes(self._buf[:i])
+        del self._buf[:i + 1]
+        return line
+
+    def _read_exact(self, n: int, deadline: float) -> bytes:
+        while len(self._buf) < n:
+            self._fill(deadline)
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        return data
+
+    def capture(self) -> bytes:
+        """1枚撮影してPNGバイト列をstdout経由で受信（CAPTURE_TIMEOUT秒で打ち切り）"""
+        deadline = time.monotonic() + CAPTURE_TIMEOUT
+        self._proc.stdin.write(b"SHOT\n")
+        self._proc.stdin.flush()
+
+        header = self._read_line(deadline)
+        if not header.strip().isdigit():
+            raise RuntimeError(
+                f"PowerShellエラー: {header.decode(errors='replace').strip() or 'デーモン停止'}"
+            )
+        return self._read_exact(int(header), deadline)
+
+
+_capture_daemon = None
+
+
+def _get_capture_daemon() -> _PSCaptureDaemon:
+    """デーモンのシングルトン取得（死んでいたら再起動）"""
+    global _capture_daemon
+    if _capture_daemon is None or not _capture_daemon.alive():
+        _capture_daemon = _PSCaptureDaemon()
+    return _capture_daemon
+
 
-        if result.returncode != 0 or not os.path.exists(tmp_path):
-            raise RuntimeError(f"PowerShellエラー: {result.stderr}")
+def capture_screen() -> Image.Image:
+    """常駐PowerShellからPNGバイト列を直接受信してスクリーンショット取得"""
+    png_bytes = _get_capture_daemon().capture()
+    img = Image.open(io.BytesIO(png_bytes))
+    img.load()
+    return img
 
-        img = Image.open(tmp_path)
-        img.load()
-        return img
 
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+def _blend_red(arr: np.ndarray, alpha: int) -> np.ndarray:
+    """スライスに赤をアルファ合成（arrはuint8 RGB）"""
+    red = np.array([255, 0, 0], dtype=np.uint16)
+    mixed = (arr.astype(np.uint16) * (255 - alpha) + red * alpha) // 255
+    return mixed.astype(np.uint8)
 
 
 def draw_grid(img: Image.Image, grid_size: int) -> Image.Image:
-    """グリッド線描画（赤半透明）"""
-    img_copy = img.copy()
-    draw = ImageDraw.Draw(img_copy, 'RGBA')
-    w, h = img_copy.size
+    """グリッド線描画（赤半透明・NumPyストライプ代入）"""
+    arr = np.array(img.convert('RGB'))
 
-    for x in range(0, w, grid_size):
-        draw.line([(x, 0), (x, h)], fill=(255, 0, 0, 128), width=1)
-    for y in range(0, h, grid_size):
-        draw.line([(0, y), (w, y)], fill=(255, 0, 0, 128), width=1)
+    # 縦横ストライプをまとめてアルファ合成（ImageDraw呼び出し不要）
+    arr[:, ::grid_size] = _blend_red(arr[:, ::grid_size], 128)
+    arr[::grid_size, :] = _blend_red(arr[::grid_size, :], 128)
 
-    return img_copy
+    return Image.fromarray(arr)
 
 
 def create_checkerboard(img: Image.Image, mode: str, grid_size: int) -> Image.Image:
     """チェッカーボード生成 (A=偶数表示, B=奇数表示)"""
-    img_copy = img.copy()
-    draw = ImageDraw.Draw(img_copy)
-    w, h = img_copy.size
+    arr = np.array(img.convert('RGB'))
+    h, w = arr.shape[:2]
 
-    cols = (w + grid_size - 1) // grid_size
-    rows = (h + grid_size - 1) // grid_size
+    # ピクセル毎のセル偶奇マスクを一括生成（端の欠けセルも自然に処理）
+    cell_y = np.arange(h) // grid_size
+    cell_x = np.arange(w) // grid_size
+    is_even = (cell_y[:, None] + cell_x[None, :]) % 2 == 0
 
-    for row in range(rows):
-        for col in range(cols):
-            is_even = (row + col) % 2 == 0
-            should_black = (mode == 'A' and not is_even) or (mode == 'B' and is_even)
+    should_black = ~is_even if mode == 'A' else is_even
+    arr[should_black] = 0
 
-            if should_black:
-                x1, y1 = col * grid_size, row * grid_size
-                x2, y2 = min(x1 + grid_size, w), min(y1 + grid_size, h)
-                draw.rectangle([x1, y1, x2, y2], fill=(0, 0, 0))
-
-    return draw_grid(img_copy, grid_size)
+    return draw_grid(Image.fromarray(arr), grid_size)
 
 
 def take_screenshot():
@@ -173,6 +265,7 @@ def take_screenshot():
     try:
         raw = capture_screen()
         w, h = raw.size
+        arr = np.asarray(raw.convert('RGB'))
 
         # 24分割: 6列 × 4行
         cols, rows = 6, 4
@@ -182,44 +275,60 @@ def take_screenshot():
         tile_dir = os.path.join(SCREENSHOT_DIR, f"{timestamp}_tiles")
         os.makedirs(tile_dir, exist_ok=True)
 
-        # 24タイル生成
+        # 24タイル生成（NumPy viewを並列PNGエンコード、libpngはGIL解放）
+        thumb_w, thumb_h = 64, 54  # 各タイルのサムネサイズ
+
+        def _encode_tile(view, path):
+            # 短命タイルなので圧縮は最低レベルで十分
+            Image.fromarray(view).save(path, compress_level=1)
+
+        def _make_thumb(view):
+            # cv2があればINTER_AREA（面積平均）、なければストライド間引き
+            try:
+                import cv2
+                return cv2.resize(view, (thumb_w, thumb_h),
+                                  interpolation=cv2.INTER_AREA)
+            except ImportError:
+                sy, sx = tile_h // thumb_h, tile_w // thumb_w
+                return view[::sy, ::sx][:thumb_h, :thumb_w]
+
+        # タイル書き出しは完了を待たずに次のキャプチャと重ねる
+        # （サムネはモンタージュ生成に必要なので待つ）
         tile_paths = []
+        thumb_futures = []
         for row in range(rows):
             for col in range(cols):
-                x1, y1 = col * tile_w, row * tile_h
-                x2, y2 = x1 + tile_w, y1 + tile_h
-                tile = raw.crop((x1, y1, x2, y2))
-                tile_name = f"tile_r{row}_c{col}.png"
-                tile_path = os.path.join(tile_dir, tile_name)
-                tile.save(tile_path)
+                view = arr[row * tile_h:(row + 1) * tile_h,
+                           col * tile_w:(col + 1) * tile_w]
+                tile_path = os.path.join(tile_dir, f"tile_r{row}_c{col}.png")
+                save_future = _WRITE_POOL.submit(_encode_tile, view, tile_path)
+                save_future.add_done_callback(_report_write_error)
+                thumb_futures.append(_WRITE_POOL.submit(_make_thumb, view))
                 tile_paths.append(tile_path)
+        thumbs = [f.result() for f in thumb_futures]
 
-        # グリッド画像（24分割線入り）
-        grid_img = raw.copy()
-        draw = ImageDraw.Draw(grid_img, 'RGBA')
+        # グリッド画像（24分割線入り・NumPyストライプ代入）
+        grid_arr = arr.copy()
         for col in range(1, cols):
             x = col * tile_w
-            draw.line([(x, 0), (x, h)], fill=(255, 0, 0, 200), width=2)
+            grid_arr[:, x:x + 2] = _blend_red(grid_arr[:, x:x + 2], 200)
         for row in range(1, rows):
             y = row * tile_h
-            draw.line([(0, y), (w, y)], fill=(255, 0, 0, 200), width=2)
-
-        # サムネイル結合画像（低トークン版）
-        thumb_w, thumb_h = 64, 54  # 各タイルのサムネサイズ
-        montage = Image.new('RGB', (thumb_w * cols, thumb_h * rows))
-        for row in range(rows):
-            for col in range(cols):
-                x1, y1 = col * tile_w, row * tile_h
-                x2, y2 = x1 + tile_w, y1 + tile_h
-                tile = raw.crop((x1, y1, x2, y2))
-                thumb = tile.resize((thumb_w, thumb_h), Image.LANCZOS)
-                montage.paste(thumb, (col * thumb_w, row * thumb_h))
-        # サムネにグリッド線追加
-        draw_m = ImageDraw.Draw(montage)
+            grid_arr[y:y + 2, :] = _blend_red(grid_arr[y:y + 2, :], 200)
+        grid_img = Image.fromarray(grid_arr)
+
+        # サムネイル結合画像（低トークン版・事前確保配列へブロック代入）
+        montage_arr = np.empty((thumb_h * rows, thumb_w * cols, 3), np.uint8)
+        for i, thumb in enumerate(thumbs):
+            row, col = divmod(i, cols)
+            montage_arr[row * thumb_h:(row + 1) * thumb_h,
+                        col * thumb_w:(col + 1) * thumb_w] = thumb
+        # サムネにグリッド線追加（NumPyストライプ代入）
         for col in range(1, cols):
-            draw_m.line([(col * thumb_w, 0), (col * thumb_w, thumb_h * rows)], fill=(255, 0, 0), width=1)
+            montage_arr[:, col * thumb_w] = (255, 0, 0)
         for row in range(1, rows):
-            draw_m.line([(0, row * thumb_h), (thumb_w * cols, row * thumb_h)], fill=(255, 0, 0), width=1)
+            montage_arr[row * thumb_h, :] = (255, 0, 0)
+        montage = Image.fromarray(montage_arr)
 
         # 保存
         paths = {
@@ -21,105 +21,104 @@ import argparse
 import json
 import glob
 import shutil
+import threading
 from datetime import datetime
+import numpy as np
 from PIL import Image
-from collections import Counter
+from _tile_meta_cache import load_meta, save_meta
+from _tile_kernels import analyze_rgb
 
 SCREENSHOT_DIR = os.path.expanduser("~/Generalstab/VLA_screenshots")
 TILE_CACHE_DIR = os.path.expanduser("~/Generalstab/SharedReminders/vla/tile_cache")
 DIFF_REPORT_PATH = os.path.expanduser("~/Generalstab/SharedReminders/vla/diff_report.md")
+ANALYZE_CACHE_PATH = os.path.expanduser("~/.cache/vlm/analyze_cache.pkl")
+ANALYZE_CACHE_KEEP = 500  # 80フレーム×24タイル+余裕をカバー
+TILE_ROWS = 4  # 撮影側の24分割（6列×4行）と揃える
+TILE_COLS = 6
 
 
-def compute_dhash(img: Image.Image, hash_size: int = 8) -> int:
+def _fast_open(path: str, target_size: tuple = None) -> Image.Image:
     """
-    差分ハッシュ（dHash）計算 - PIL自前実装
+    画像オープン（JPEGはdraftで縮小デコード）
+    PNGはdraft非対応なのでそのまま全解像度デコードになる
+    （撮影側をJPEG出力に切り替えればここが自動で効く）
+    """
+    img = Image.open(path)
+    if target_size is not None and img.format == 'JPEG':
+        img.draft('RGB', target_size)
+    img.load()
+    return img
+
+
+def _load_tile(path: str) -> tuple:
+    """タイルを1回だけデコードしてRGB配列+グレー配列を返す"""
+    rgb = np.asarray(_fast_open(path).convert('RGB'))
+    gray = (0.299 * rgb[..., 0] + 0.587 * rgb[..., 1] + 0.114 * rgb[..., 2]).astype(np.uint8)
+    return rgb, gray
+
+
+def compute_dhash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """
+    差分ハッシュ（dHash）計算 - NumPyベクトル化実装
     隣接ピクセルの明暗比較で64bitハッシュ生成
     """
     # リサイズ（hash_size+1 x hash_size）
-    img = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
-    pixels = list(img.getdata())
-
-    # 隣接ピクセル比較でビット列生成
-    diff = []
-    for row in range(hash_size):
-        for col in range(hash_size):
-            left = pixels[row * (hash_size + 1) + col]
-            right = pixels[row * (hash_size + 1) + col + 1]
-            diff.append(1 if left > right else 0)
+    img = Image.fromarray(gray, 'L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    arr = np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(hash_size, hash_size + 1)
 
-    # ビット列を整数に変換
-    return int(''.join(map(str, diff)), 2)
+    # 隣接ピクセル比較→ビットパック（Pythonループ不要）
+    diff = arr[:, :-1] > arr[:, 1:]
+    return int.from_bytes(np.packbits(diff).tobytes(), 'big')
 
 
 def hamming_distance(hash1: int, hash2: int) -> int:
     """ハミング距離（異なるビット数）"""
-    return bin(hash1 ^ hash2).count('1')
-
-
-def compute_histogram(img: Image.Image) -> dict:
-    """色ヒストグラム計算（RGB各256bin）"""
-    img = img.convert('RGB')
-    r, g, b = img.split()
-    return {
-        'r': r.histogram(),
-        'g': g.histogram(),
-        'b': b.histogram()
-    }
+    return (hash1 ^ hash2).bit_count()
 
 
-def histogram_diff(hist1: dict, hist2: dict) -> float:
+def histogram_diff(hist1: np.ndarray, hist2: np.ndarray) -> float:
     """ヒストグラム差分（0.0-1.0）"""
-    total_diff = 0
-    total_pixels = 0
-    for channel in ['r', 'g', 'b']:
-        for i in range(256):
-            total_diff += abs(hist1[channel][i] - hist2[channel][i])
-            total_pixels += hist1[channel][i] + hist2[channel][i]
-    return total_diff / max(total_pixels, 1)
+    total_diff = np.abs(hist1.astype(np.int64) - hist2).sum()
+    total_pixels = hist1.sum() + hist2.sum()
+    return float(total_diff) / max(int(total_pixels), 1)
 
 
-def get_dominant_colors(img: Image.Image, n: int = 3) -> list:
+def get_dominant_colors(rgb: np.ndarray, n: int = 3) -> list:
     """支配色抽出（上位n色）"""
-    img = img.convert('RGB').resize((50, 50), Image.LANCZOS)  # 縮小で高速化
-    pixels = list(img.getdata())
-
-    # 色を16段階に量子化（4096色に削減）
-    quantized = []
-    for r, g, b in pixels:
-        qr, qg, qb = r // 16, g // 16, b // 16
-        quantized.append((qr * 16, qg * 16, qb * 16))
-
-    counter = Counter(quantized)
-    top_colors = counter.most_common(n)
-
-    return [f"#{r:02X}{g:02X}{b:02X}" for (r, g, b), _ in top_colors]
-
-
-def get_brightness(img: Image.Image) -> float:
-    """平均輝度（0.0-1.0）"""
-    img = img.convert('L')
-    pixels = list(img.getdata())
-    return sum(pixels) / (len(pixels) * 255)
-
+    # ストライドスライスで約50x50に縮小（量子化用途なのでLANCZOS不要）
+    h, w = rgb.shape[:2]
+    small = rgb[::max(h // 50, 1), ::max(w // 50, 1)]
+
+    # 色を16段階に量子化（4096色）してuint16キーにパック
+    q = (small >> 4).astype(np.uint16)
+    packed = (q[..., 0] << 8) | (q[..., 1] << 4) | q[..., 2]
+    vals, counts = np.unique(packed, return_counts=True)
+
+    # 上位n色（argpartitionで部分選択→出現数降順）
+    if len(vals) > n:
+        idx = np.argpartition(-counts, n)[:n]
+    else:
+        idx = np.arange(len(vals))
+    idx = idx[np.argsort(-counts[idx])]
 
-def get_color_ratio(img: Image.Image) -> dict:
-    """明暗比率"""
-    brightness = get_brightness(img)
-    img = img.convert('L')
-    pixels = list(img.getdata())
-    dark = sum(1 for p in pixels if p < 85) / len(pixels)
-    mid = sum(1 for p in pixels if 85 <= p < 170) / len(pixels)
-    light = sum(1 for p in pixels if p >= 170) / len(pixels)
-    return {'dark': round(dark, 2), 'mid': round(mid, 2), 'light': round(light, 2)}
+    return [
+        f"#{(v >> 8 & 0xF) * 16:02X}{(v >> 4 & 0xF) * 16:02X}{(v & 0xF) * 16:02X}"
+        for v in vals[idx]
+    ]
 
 
-def analyze_tile(img_path: str) -> dict:
-    """タイル分析（色メタデータ生成）"""
-    img = Image.open(img_path)
+def analyze_tile(rgb: np.ndarray) -> dict:
+    """タイル分析（色メタデータ生成・融合カーネルで1走査）"""
+    dark, mid, light, brightness, hist = analyze_rgb(rgb)
     return {
-        'dominant_colors': get_dominant_colors(img),
-        'color_ratio': get_color_ratio(img),
-        'brightness': round(get_brightness(img), 2)
+        'dominant_colors': get_dominant_colors(rgb),
+        'color_ratio': {
+            'dark': round(dark, 2),
+            'mid': round(mid, 2),
+            'light': round(light, 2)
+        },
+        'brightness': round(brightness, 2),
+        'hist': hist
     }
 
 
@@ -140,69 +139,168 @@ def list_tiles(tile_dir: str) -> list:
     return sorted(glob.glob(pattern))
 
 
-def compare_tiles(prev_dir: str, curr_dir: str,
-                  dhash_threshold: int = 3,
-                  histogram_threshold: float = 0.05) -> dict:
-    """タイル比較（差分検出）"""
-    results = {
-        'changed': [],
-        'unchanged': [],
-        'details': {}
+def _sha1_file(path: str) -> bytes:
+    """ファイルのSHA-1（64KiBチャンクでストリーム計算）"""
+    import hashlib
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while chunk := f.read(65536):
+            h.update(chunk)
+    return h.digest()
+
+
+# SHA-1（内容）キーの分析メモ: パスやmtimeが変わっても画素同一ならヒット
+_analyze_cache = None
+_analyze_cache_lock = threading.Lock()  # compare_tilesのワーカーが同時初期化しないように
+
+
+def _save_analyze_cache():
+    """プロセス終了時にキャッシュをpickle保存（直近ANALYZE_CACHE_KEEP件）"""
+    import pickle
+    cache = _analyze_cache or {}
+    if len(cache) > ANALYZE_CACHE_KEEP:
+        cache = dict(list(cache.items())[-ANALYZE_CACHE_KEEP:])
+    try:
+        os.makedirs(os.path.dirname(ANALYZE_CACHE_PATH), exist_ok=True)
+        with open(ANALYZE_CACHE_PATH, 'wb') as f:
+            pickle.dump(cache, f)
+    except OSError:
+        pass
+
+
+def _get_analyze_cache() -> dict:
+    """分析メモ取得（初回にpickleから復元、終了時保存を登録）"""
+    global _analyze_cache
+    if _analyze_cache is None:
+        with _analyze_cache_lock:
+            if _analyze_cache is None:
+                import atexit
+                import pickle
+                try:
+                    with open(ANALYZE_CACHE_PATH, 'rb') as f:
+                        cache = pickle.load(f)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    cache = {}
+                atexit.register(_save_analyze_cache)
+                _analyze_cache = cache
+    return _analyze_cache
+
+
+def _get_tile_meta(path: str) -> dict:
+    """タイルのdHash/ヒストグラム/色メタデータ取得（mtime+内容ハッシュキャッシュ付き）"""
+    cached = load_meta(path)
+    if cached is not None:
+        return cached
+
+    # mtimeミスでも画素が同一なら再分析しない（auto_capture下の定常画面向け）
+    memo = _get_analyze_cache()
+    sha1_hex = _sha1_file(path).hex()
+    meta = memo.get(sha1_hex)
+    if meta is None:
+        rgb, gray = _load_tile(path)
+        meta = analyze_tile(rgb)
+        meta['dhash'] = compute_dhash(gray)
+        memo[sha1_hex] = meta
+    save_meta(path, meta)
+    return meta
+
+
+def _diff_one_tile(tile_id: str, tile_path: str, prev_dir: str,
+                   dhash_threshold: int,
+                   histogram_threshold: float):
+    """1タイル分の差分検出（並列ワーカー用）"""
+    tile_name = os.path.basename(tile_path)
+    prev_path = os.path.join(prev_dir, tile_name) if prev_dir else None
+
+    # PNGバイト同一なら無変化確定（静的UI領域で多発、デコードもハッシュ計算も不要）
+    if (prev_path and os.path.exists(prev_path)
+            and os.path.getsize(tile_path) == os.path.getsize(prev_path)
+            and _sha1_file(tile_path) == _sha1_file(prev_path)):
+        meta = _get_tile_meta(prev_path)
+        save_meta(tile_path, meta)  # 次フレームで前回側のキャッシュヒットにする
+        detail = {
+            'dominant_colors': meta['dominant_colors'],
+            'color_ratio': meta['color_ratio'],
+            'brightness': meta['brightness'],
+            'dhash_diff': 0,
+            'histogram_diff': 0.0,
+            'changed': False
+        }
+        return tile_id, detail, False
+
+    curr = _get_tile_meta(tile_path)
+    curr_meta = {
+        'dominant_colors': curr['dominant_colors'],
+        'color_ratio': curr['color_ratio'],
+        'brightness': curr['brightness']
     }
 
-    curr_tiles = list_tiles(curr_dir)
+    if prev_path and os.path.exists(prev_path):
+        # 前回タイルはキャッシュヒット時デコード不要
+        prev = _get_tile_meta(prev_path)
 
-    for tile_path in curr_tiles:
-        tile_name = os.path.basename(tile_path)
-        prev_path = os.path.join(prev_dir, tile_name) if prev_dir else None
+        # dHash比較
+        dhash_diff = hamming_distance(curr['dhash'], prev['dhash'])
 
-        # タイル名からr,c抽出
-        import re
-        m = re.match(r'tile_r(\d+)_c(\d+)\.png', tile_name)
-        if not m:
-            continue
-        tile_id = f"r{m.group(1)}_c{m.group(2)}"
+        # ヒストグラム比較
+        hist_diff = histogram_diff(curr['hist'], prev['hist'])
 
-        curr_img = Image.open(tile_path)
-        curr_meta = analyze_tile(tile_path)
+        # 変化判定
+        is_changed = dhash_diff > dhash_threshold or hist_diff > histogram_threshold
 
-        if prev_path and os.path.exists(prev_path):
-            prev_img = Image.open(prev_path)
+        detail = {
+            **curr_meta,
+            'dhash_diff': dhash_diff,
+            'histogram_diff': round(hist_diff, 4),
+            'changed': is_changed
+        }
+    else:
+        # 前回なし = 新規（変化扱い）
+        is_changed = True
+        detail = {
+            **curr_meta,
+            'dhash_diff': None,
+            'histogram_diff': None,
+            'changed': True,
+            'new': True
+        }
 
-            # dHash比較
-            curr_hash = compute_dhash(curr_img)
-            prev_hash = compute_dhash(prev_img)
-            dhash_diff = hamming_distance(curr_hash, prev_hash)
+    return tile_id, detail, is_changed
 
-            # ヒストグラム比較
-            curr_hist = compute_histogram(curr_img)
-            prev_hist = compute_histogram(prev_img)
-            hist_diff = histogram_diff(curr_hist, prev_hist)
 
-            # 変化判定
-            is_changed = dhash_diff > dhash_threshold or hist_diff > histogram_threshold
+def compare_tiles(prev_dir: str, curr_dir: str,
+                  dhash_threshold: int = 3,
+                  histogram_threshold: float = 0.05) -> dict:
+    """タイル比較（差分検出・24タイル並列）"""
+    from concurrent.futures import ThreadPoolExecutor
 
-            results['details'][tile_id] = {
-                **curr_meta,
-                'dhash_diff': dhash_diff,
-                'histogram_diff': round(hist_diff, 4),
-                'changed': is_changed
-            }
+    results = {
+        'changed': [],
+        'unchanged': [],
+        'details': {}
+    }
 
+    # タイル名は決定的（r0-3 × c0-5）なのでglobや正規表現での解析は不要
+    jobs = []
+    for row in range(TILE_ROWS):
+        for col in range(TILE_COLS):
+            tile_path = os.path.join(curr_dir, f"tile_r{row}_c{col}.png")
+            if os.path.exists(tile_path):
+                jobs.append((f"r{row}_c{col}", tile_path))
+
+    # PILデコードとNumPy演算はGILを解放するのでスレッドで並列化できる
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        outputs = pool.map(
+            lambda j: _diff_one_tile(j[0], j[1], prev_dir,
+                                     dhash_threshold, histogram_threshold),
+            jobs
+        )
+        for tile_id, detail, is_changed in outputs:
+            results['details'][tile_id] = detail
             if is_changed:
                 results['changed'].append(tile_id)
             else:
                 results['unchanged'].append(tile_id)
-        else:
-            # 前回なし = 新規（変化扱い）
-            results['details'][tile_id] = {
-                **curr_meta,
-                'dhash_diff': None,
-                'histogram_diff': None,
-                'changed': True,
-                'new': True
-            }
-            results['changed'].append(tile_id)
 
     return results
 